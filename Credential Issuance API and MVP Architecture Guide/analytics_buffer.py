@@ -0,0 +1,153 @@
+"""
+Batched analytics event ingestion for the Digital Credentials Platform.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from .database import SessionLocal
+from .models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+# Flush whenever the buffer holds this many events or the oldest staged
+# event has waited this long
+_MAX_BUFFER_SIZE = 500
+_MAX_BUFFER_AGE_SECONDS = 0.25
+
+# Stop re-staging failed batches once the buffer holds this many events,
+# so a long database outage can't grow it without bound
+_MAX_RETAINED_EVENTS = 10 * _MAX_BUFFER_SIZE
+
+
+class AnalyticsBuffer:
+    """Bounded in-memory buffer that coalesces analytics events.
+
+    View/download/verify events are the highest-volume writes in the
+    schema; staging them as parallel per-column lists and writing one bulk
+    INSERT per flush costs one network round-trip and one WAL fsync per
+    batch instead of per event.
+    """
+
+    def __init__(
+        self,
+        max_size: int = _MAX_BUFFER_SIZE,
+        max_age_seconds: float = _MAX_BUFFER_AGE_SECONDS
+    ):
+        self.max_size = max_size
+        self.max_age_seconds = max_age_seconds
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Struct-of-arrays staging: one list per column
+        self.event_types: List[str] = []
+        self.credential_ids: List[Optional[str]] = []
+        self.user_ids: List[Optional[str]] = []
+        self.organization_ids: List[Optional[str]] = []
+        self.event_data: List[Optional[Dict[str, Any]]] = []
+        self.ip_addresses: List[Optional[str]] = []
+        self.user_agents: List[Optional[str]] = []
+        self.referrers: List[Optional[str]] = []
+        self._oldest_at = None
+
+    async def add(
+        self,
+        event_type: str,
+        credential_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+        organization_id: Optional[str] = None,
+        event_data: Optional[Dict[str, Any]] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        referrer: Optional[str] = None
+    ):
+        """Stage one event; flushes when the batch is full or stale."""
+        async with self._lock:
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            self.event_types.append(event_type)
+            self.credential_ids.append(credential_id)
+            self.user_ids.append(user_id)
+            self.organization_ids.append(organization_id)
+            self.event_data.append(event_data)
+            self.ip_addresses.append(ip_address)
+            self.user_agents.append(user_agent)
+            self.referrers.append(referrer)
+            should_flush = (
+                len(self.event_types) >= self.max_size
+                or time.monotonic() - self._oldest_at >= self.max_age_seconds
+            )
+        if should_flush:
+            await self.flush()
+
+    async def flush(self):
+        """Write all staged events in one batched INSERT."""
+        async with self._lock:
+            if not self.event_types:
+                return
+            rows = [
+                {
+                    "event_type": event_type,
+                    "credential_id": credential_id,
+                    "user_id": user_id,
+                    "organization_id": organization_id,
+                    "event_data": event_data,
+                    "ip_address": ip_address,
+                    "user_agent": user_agent,
+                    "referrer": referrer,
+                }
+                for event_type, credential_id, user_id, organization_id,
+                    event_data, ip_address, user_agent, referrer in zip(
+                        self.event_types, self.credential_ids, self.user_ids,
+                        self.organization_ids, self.event_data,
+                        self.ip_addresses, self.user_agents, self.referrers
+                    )
+            ]
+            self._reset()
+        try:
+            await asyncio.to_thread(self._write_rows, rows)
+        except Exception as e:
+            # A transient DB error must not drop the batch, escape into the
+            # request handler that happened to trigger the flush, or kill
+            # the drain loop; log it and put the rows back for the next try
+            logger.error(f"Analytics flush of {len(rows)} events failed: {e}")
+            await self._restage(rows)
+
+    async def _restage(self, rows: List[Dict[str, Any]]):
+        """Return a failed batch to the buffer so the next flush retries it."""
+        async with self._lock:
+            if len(self.event_types) + len(rows) > _MAX_RETAINED_EVENTS:
+                logger.error(f"Analytics buffer full; dropping {len(rows)} events")
+                return
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            for row in rows:
+                self.event_types.append(row["event_type"])
+                self.credential_ids.append(row["credential_id"])
+                self.user_ids.append(row["user_id"])
+                self.organization_ids.append(row["organization_id"])
+                self.event_data.append(row["event_data"])
+                self.ip_addresses.append(row["ip_address"])
+                self.user_agents.append(row["user_agent"])
+                self.referrers.append(row["referrer"])
+
+    @staticmethod
+    def _write_rows(rows: List[Dict[str, Any]]):
+        with SessionLocal() as db:
+            db.bulk_insert_mappings(AnalyticsEvent, rows)
+            db.commit()
+
+    async def run(self, interval: Optional[float] = None):
+        """Periodic flush loop; schedule at app startup so quiet periods
+        still drain the buffer."""
+        interval = interval or self.max_age_seconds
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+# Shared buffer for the service; endpoints call `await analytics_buffer.add(...)`
+analytics_buffer = AnalyticsBuffer()
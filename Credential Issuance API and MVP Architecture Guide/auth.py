@@ -2,13 +2,22 @@
 Authentication and authorization utilities.
 """
 
+import base64
+import hmac
+import os
+import time
+import anyio
+import anyio.to_thread
 import jwt
+import orjson
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import bcrypt
+import xxhash
+from cachetools import TTLCache
 
 from .config import settings
 from .database import get_db_session
@@ -17,10 +26,36 @@ from .exceptions import AuthenticationError, AuthorizationError
 
 security = HTTPBearer()
 
+# JWT parameters bound once at import; avoids pydantic attribute lookups on
+# every token operation. PyJWT accepts the secret as bytes directly, and
+# integer exp/iat skip the datetime -> POSIX conversion it would do anyway.
+_JWT_SECRET = settings.jwt_secret_key.encode()
+_JWT_ALG = settings.jwt_algorithm
+_JWT_EXP_SECONDS = settings.jwt_expiration_hours * 3600
+_REFRESH_EXP_SECONDS = 30 * 24 * 3600  # Refresh tokens last 30 days
+
+# In-process cache of verified JWT claims, keyed by a 64-bit hash of the raw
+# token. Hits skip base64/JSON decoding and HMAC verification entirely; only
+# the decoded claims dict is stored, never the raw token.
+_TOKEN_CACHE = TTLCache(maxsize=100_000, ttl=300)
+_REVOKED_TOKEN_KEYS = set()
+
+# Short-lived cache of authenticated users keyed by user_id, so hot request
+# paths skip the per-request Postgres lookup. Entries are transient copies,
+# never session-bound rows. Evict explicitly via invalidate_user_cache()
+# whenever a user row changes.
+_USER_CACHE = TTLCache(maxsize=50_000, ttl=60)
+
+# Access-relevant credential fields keyed by credential_id, so repeated
+# permission checks against the same credential don't re-query Postgres.
+# Evict via invalidate_credential_access_cache() whenever a write changes
+# any of the cached fields (e.g. is_public on update, status on revoke).
+_CREDENTIAL_ACCESS_CACHE = TTLCache(maxsize=10_000, ttl=30)
+
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
+    """Hash a password using bcrypt (native Rust/C backend, bcrypt>=4.1)."""
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_cost)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
@@ -30,45 +65,123 @@ def verify_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
+# Bounded worker pool for bcrypt: hashing at cost 12 blocks for ~250ms, so
+# async endpoints must not run it on the event loop, and the limiter caps
+# concurrent hashes at roughly one per core.
+_BCRYPT_LIMITER = anyio.CapacityLimiter(max(2, os.cpu_count() or 2))
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in a bounded worker thread (for async endpoints)."""
+    return await anyio.to_thread.run_sync(hash_password, password, limiter=_BCRYPT_LIMITER)
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Verify a password in a bounded worker thread (for async endpoints)."""
+    return await anyio.to_thread.run_sync(
+        verify_password, password, hashed_password, limiter=_BCRYPT_LIMITER
+    )
+
+
 def create_jwt_token(user_id: str, email: str, role: str, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT token for a user."""
+    now = int(time.time())
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(hours=settings.jwt_expiration_hours)
-    
+        expire = now + _JWT_EXP_SECONDS
+
     payload = {
         "sub": str(user_id),
         "email": email,
         "role": role,
         "exp": expire,
-        "iat": datetime.utcnow(),
+        "iat": now,
         "type": "access"
     }
-    
-    token = jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+    token = jwt.encode(payload, _JWT_SECRET, algorithm=_JWT_ALG)
     return token
 
 
 def create_refresh_token(user_id: str) -> str:
     """Create a refresh token for a user."""
-    expire = datetime.utcnow() + timedelta(days=30)  # Refresh tokens last 30 days
-    
+    now = int(time.time())
+
     payload = {
         "sub": str(user_id),
-        "exp": expire,
-        "iat": datetime.utcnow(),
+        "exp": now + _REFRESH_EXP_SECONDS,
+        "iat": now,
         "type": "refresh"
     }
-    
-    token = jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+
+    token = jwt.encode(payload, _JWT_SECRET, algorithm=_JWT_ALG)
     return token
 
 
+def _b64url_decode(data: bytes) -> bytes:
+    """Base64url-decode with padding restored (stdlib C accelerator)."""
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+def _fast_verify_hs256(token: bytes) -> Dict[str, Any]:
+    """Verify and decode an HS256 token without going through PyJWT.
+
+    The base64, HMAC and JSON steps all run in C (stdlib base64/hmac and
+    orjson), which avoids PyJWT's pure-Python wrappers on the hot path.
+    """
+    try:
+        signing_input, _, signature = token.rpartition(b'.')
+        header_b64, _, payload_b64 = signing_input.partition(b'.')
+
+        expected = hmac.new(_JWT_SECRET, signing_input, 'sha256').digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            raise AuthenticationError("Invalid token")
+
+        # Reject any alg other than HS256 before trusting the payload
+        header = orjson.loads(_b64url_decode(header_b64))
+        if header.get("alg") != "HS256":
+            raise AuthenticationError("Invalid token")
+
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except AuthenticationError:
+        raise
+    except Exception:
+        raise AuthenticationError("Invalid token")
+
+    exp = payload.get("exp")
+    if exp is not None and exp < time.time():
+        raise AuthenticationError("Token has expired")
+
+    return payload
+
+
 def verify_jwt_token(token: str) -> Dict[str, Any]:
     """Verify and decode a JWT token."""
+    token_key = xxhash.xxh3_64_intdigest(token)
+
+    if token_key in _REVOKED_TOKEN_KEYS:
+        raise AuthenticationError("Token has been revoked")
+
+    # Fast path: claims already verified recently. Tokens without an exp
+    # claim never expire, matching the miss-path semantics.
+    cached_payload = _TOKEN_CACHE.get(token_key)
+    if cached_payload is not None:
+        exp = cached_payload.get("exp")
+        if exp is not None and exp < time.time():
+            _TOKEN_CACHE.pop(token_key, None)
+            raise AuthenticationError("Token has expired")
+        return cached_payload
+
+    # HS256 gets the lean stdlib path; anything else falls back to PyJWT
+    if _JWT_ALG == "HS256":
+        payload = _fast_verify_hs256(token.encode())
+        _TOKEN_CACHE[token_key] = payload
+        return payload
+
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        payload = jwt.decode(token, _JWT_SECRET, algorithms=[_JWT_ALG])
+        _TOKEN_CACHE[token_key] = payload
         return payload
     except jwt.ExpiredSignatureError:
         raise AuthenticationError("Token has expired")
@@ -76,6 +189,27 @@ def verify_jwt_token(token: str) -> Dict[str, Any]:
         raise AuthenticationError("Invalid token")
 
 
+def revoke_token(token: str):
+    """Mark a token as revoked (e.g. on logout) and drop it from the cache."""
+    token_key = xxhash.xxh3_64_intdigest(token)
+    _REVOKED_TOKEN_KEYS.add(token_key)
+    _TOKEN_CACHE.pop(token_key, None)
+
+
+def _cacheable_user_copy(user: User) -> User:
+    """Transient copy of a user row, safe to share across requests.
+
+    The session-bound instance expires on its session's next commit and
+    detaches when the session closes, so caching it would raise
+    DetachedInstanceError on the next hit; the copy carries plain column
+    values and belongs to no session.
+    """
+    copy = User()
+    for column in User.__table__.columns:
+        setattr(copy, column.key, getattr(user, column.key))
+    return copy
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db_session)
@@ -84,25 +218,34 @@ def get_current_user(
     try:
         payload = verify_jwt_token(credentials.credentials)
         user_id = payload.get("sub")
-        
+
         if user_id is None:
             raise AuthenticationError("Invalid token payload")
-        
-        user = db.query(User).filter(User.id == user_id).first()
+
+        user = _USER_CACHE.get(user_id)
         if user is None:
-            raise AuthenticationError("User not found")
-        
+            # db.get() hits the session identity map before querying
+            user = db.get(User, user_id)
+            if user is None:
+                raise AuthenticationError("User not found")
+            user = _USER_CACHE[user_id] = _cacheable_user_copy(user)
+
         if not user.is_active:
             raise AuthenticationError("User account is disabled")
-        
+
         return user
-        
+
     except AuthenticationError:
         raise
     except Exception as e:
         raise AuthenticationError(f"Authentication failed: {str(e)}")
 
 
+def invalidate_user_cache(user_id: str):
+    """Evict a user from the auth cache after their row changes."""
+    _USER_CACHE.pop(user_id, None)
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get the current active user."""
     if not current_user.is_active:
@@ -121,97 +264,133 @@ def require_role(required_role: UserRole):
 
 def require_roles(required_roles: list[UserRole]):
     """Decorator to require one of multiple user roles."""
+    # Freeze once at decorator construction: O(1) membership per request,
+    # with the implicit super-admin allowance folded into the set
+    allowed_roles = frozenset(required_roles) | {UserRole.SUPER_ADMIN}
+
     def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
-        if current_user.role not in required_roles and current_user.role != UserRole.SUPER_ADMIN:
+        if current_user.role not in allowed_roles:
             raise AuthorizationError(f"Access denied. Required roles: {required_roles}")
         return current_user
     return role_checker
 
 
-def check_organization_access(user: User, organization_id: str, db: Session) -> bool:
-    """Check if user has access to an organization."""
+def check_organization_access(user: User, organization_id: str, db: Session,
+                              memberships: Optional[Dict[str, Any]] = None) -> bool:
+    """Check if user has access to an organization.
+
+    Pass a prefetched memberships dict (keyed by str organization_id) to
+    answer from memory instead of issuing a query per check.
+    """
     from .models import OrganizationMember
-    
+
     # Super admins have access to everything
     if user.role == UserRole.SUPER_ADMIN:
         return True
-    
+
+    if memberships is not None:
+        return str(organization_id) in memberships
+
     # Check if user is a member of the organization
     membership = db.query(OrganizationMember).filter(
         OrganizationMember.user_id == user.id,
         OrganizationMember.organization_id == organization_id
     ).first()
-    
+
     return membership is not None
 
 
 def check_credential_access(user: User, credential_id: str, db: Session, action: str = "read") -> bool:
     """Check if user has access to a credential."""
-    from .models import Credential, OrganizationMember
-    
-    credential = db.query(Credential).filter(Credential.id == credential_id).first()
-    if not credential:
-        return False
-    
-    # Super admins have access to everything
+    from .models import Credential
+
+    # Super admins have access to everything; skip the DB entirely
     if user.role == UserRole.SUPER_ADMIN:
         return True
-    
+
+    # The fields that drive the decision are tiny and stable; cache them so
+    # repeated checks for the same credential skip the query
+    access_row = _CREDENTIAL_ACCESS_CACHE.get(credential_id)
+    if access_row is None:
+        # db.get() hits the session identity map before querying
+        credential = db.get(Credential, credential_id)
+        if not credential:
+            return False
+        access_row = (
+            credential.recipient_id,
+            credential.issuer_id,
+            str(credential.organization_id),
+            credential.is_public
+        )
+        _CREDENTIAL_ACCESS_CACHE[credential_id] = access_row
+
+    recipient_id, issuer_id, organization_id, is_public = access_row
+
     # Recipients can always access their own credentials
-    if credential.recipient_id == user.id:
+    if recipient_id == user.id:
         return True
-    
+
     # Issuers can access credentials they issued
-    if credential.issuer_id == user.id:
+    if issuer_id == user.id:
         return True
-    
+
     # Check organization membership for other actions
     if action in ["write", "delete"]:
-        return check_organization_access(user, str(credential.organization_id), db)
-    
+        return check_organization_access(user, organization_id, db)
+
     # For read access, check if credential is public or user has organization access
-    if credential.is_public:
+    if is_public:
         return True
-    
-    return check_organization_access(user, str(credential.organization_id), db)
+
+    return check_organization_access(user, organization_id, db)
+
+
+def invalidate_credential_access_cache(credential_id: str):
+    """Evict a credential's access tuple after its row changes."""
+    _CREDENTIAL_ACCESS_CACHE.pop(credential_id, None)
 
 
 class PermissionChecker:
     """Helper class for checking permissions."""
     
     def __init__(self, user: User, db: Session):
+        from .models import OrganizationMember
+
         self.user = user
         self.db = db
-    
+
+        # Prefetch the user's memberships once; every can_* check below is
+        # then a dict lookup instead of its own round-trip
+        self._memberships = {
+            str(membership.organization_id): membership
+            for membership in db.query(OrganizationMember).filter(
+                OrganizationMember.user_id == user.id
+            ).all()
+        }
+
     def can_issue_credentials(self, organization_id: str) -> bool:
         """Check if user can issue credentials for an organization."""
         if self.user.role in [UserRole.SUPER_ADMIN, UserRole.ISSUER_ADMIN]:
-            return check_organization_access(self.user, organization_id, self.db)
+            return check_organization_access(self.user, organization_id, self.db, self._memberships)
         return False
-    
+
     def can_manage_templates(self, organization_id: str) -> bool:
         """Check if user can manage templates for an organization."""
         if self.user.role in [UserRole.SUPER_ADMIN, UserRole.ISSUER_ADMIN]:
-            return check_organization_access(self.user, organization_id, self.db)
+            return check_organization_access(self.user, organization_id, self.db, self._memberships)
         return False
-    
+
     def can_view_analytics(self, organization_id: str) -> bool:
         """Check if user can view analytics for an organization."""
         if self.user.role in [UserRole.SUPER_ADMIN, UserRole.ISSUER_ADMIN]:
-            return check_organization_access(self.user, organization_id, self.db)
+            return check_organization_access(self.user, organization_id, self.db, self._memberships)
         return False
-    
+
     def can_manage_organization(self, organization_id: str) -> bool:
         """Check if user can manage an organization."""
         if self.user.role == UserRole.SUPER_ADMIN:
             return True
-        
-        from .models import OrganizationMember
-        membership = self.db.query(OrganizationMember).filter(
-            OrganizationMember.user_id == self.user.id,
-            OrganizationMember.organization_id == organization_id,
-            OrganizationMember.role == "admin"
-        ).first()
-        
-        return membership is not None
+
+        membership = self._memberships.get(str(organization_id))
+        return membership is not None and membership.role == "admin"
 
@@ -2,10 +2,14 @@
 Blockchain integration utilities for credential verification.
 """
 
-import hashlib
+import asyncio
+import os
+import _hashlib
+import httpx
 import json
-import requests
-from typing import Dict, Any, Optional
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from web3 import Web3
 from eth_account import Account
 import logging
@@ -14,6 +18,57 @@ from shared.config import settings
 
 logger = logging.getLogger(__name__)
 
+# OpenSSL-backed SHA256 constructor (dispatches to SHA-NI/AVX2 where the CPU
+# supports it); binding it directly skips the hashlib.new() dispatch overhead.
+_sha256 = _hashlib.openssl_sha256
+
+# Registry contract ABI, parsed once at import instead of per call
+_CREDENTIAL_REGISTRY_ABI = [
+    {
+        "inputs": [
+            {"name": "credentialId", "type": "string"},
+            {"name": "credentialHash", "type": "string"}
+        ],
+        "name": "anchorCredential",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "credentialId", "type": "string"}],
+        "name": "getCredentialHash",
+        "outputs": [{"name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+class HTTP2Provider(Web3.HTTPProvider):
+    """HTTPProvider variant backed by a pooled httpx HTTP/2 client.
+
+    Anchoring/verification bursts multiplex their JSON-RPC calls over one
+    connection instead of queueing on per-request HTTP/1.1 sockets.
+    """
+
+    def __init__(self, endpoint_uri, client: Optional[httpx.Client] = None, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self._client = client or httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            timeout=30.0
+        )
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        response = self._client.post(
+            self.endpoint_uri,
+            content=request_data,
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
 
 class BlockchainVerifier:
     """Handle blockchain-based credential verification."""
@@ -22,14 +77,24 @@ class BlockchainVerifier:
         self.rpc_url = settings.polygon_rpc_url
         self.private_key = settings.polygon_private_key
         self.contract_address = settings.polygon_contract_address
-        
+
+        self.w3 = None
+        self.account = None
+        self._contract = None
+
         if self.rpc_url:
-            self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+            # Pooled HTTP/2 transport: RPC calls reuse (and multiplex over)
+            # kept-alive connections instead of paying a handshake each time
+            self.w3 = Web3(HTTP2Provider(self.rpc_url))
             if self.private_key:
                 self.account = Account.from_key(self.private_key)
-        else:
-            self.w3 = None
-            self.account = None
+            if self.contract_address:
+                # Build the Contract object once; re-parsing the ABI per
+                # call is pure overhead
+                self._contract = self.w3.eth.contract(
+                    address=self.contract_address,
+                    abi=_CREDENTIAL_REGISTRY_ABI
+                )
     
     def anchor_credential_hash(self, credential_hash: str, credential_id: str) -> Optional[str]:
         """Anchor a credential hash to the blockchain."""
@@ -39,31 +104,12 @@ class BlockchainVerifier:
             return None
         
         try:
-            # Simple contract ABI for storing hashes
-            contract_abi = [
-                {
-                    "inputs": [
-                        {"name": "credentialId", "type": "string"},
-                        {"name": "credentialHash", "type": "string"}
-                    ],
-                    "name": "anchorCredential",
-                    "outputs": [],
-                    "stateMutability": "nonpayable",
-                    "type": "function"
-                }
-            ]
-            
-            if not self.contract_address:
+            if not self._contract:
                 logger.warning("Contract address not configured")
                 return None
-            
-            contract = self.w3.eth.contract(
-                address=self.contract_address,
-                abi=contract_abi
-            )
-            
+
             # Build transaction
-            transaction = contract.functions.anchorCredential(
+            transaction = self._contract.functions.anchorCredential(
                 credential_id,
                 credential_hash
             ).build_transaction({
@@ -90,42 +136,88 @@ class BlockchainVerifier:
         except Exception as e:
             logger.error(f"Error anchoring credential hash: {e}")
             return None
-    
-    def verify_credential_hash(self, credential_hash: str, credential_id: str) -> Dict[str, Any]:
-        """Verify a credential hash against the blockchain."""
-        
+
+    async def anchor_credential_hashes_batch(self, items: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """Anchor many (credential_id, credential_hash) pairs in one batch.
+
+        Fetches the account nonce once, signs one transaction per item with
+        sequential nonces, submits them concurrently and then awaits all
+        receipts together, so bulk issuance pays ~1 pipeline of RPC latency
+        instead of N serial round-trips.
+        """
+
+        if not self.w3 or not self.account or not self._contract:
+            logger.warning("Blockchain not configured, skipping batch anchoring")
+            return [None] * len(items)
+
+        try:
+            # One nonce fetch for the whole batch
+            base_nonce = self.w3.eth.get_transaction_count(self.account.address)
+            gas_price = self.w3.to_wei('20', 'gwei')
+
+            signed_txns = []
+            for offset, (credential_id, credential_hash) in enumerate(items):
+                transaction = self._contract.functions.anchorCredential(
+                    credential_id,
+                    credential_hash
+                ).build_transaction({
+                    'from': self.account.address,
+                    'gas': 100000,
+                    'gasPrice': gas_price,
+                    'nonce': base_nonce + offset
+                })
+                signed_txns.append(
+                    self.w3.eth.account.sign_transaction(transaction, self.private_key)
+                )
+
+            # Submit all transactions concurrently, then await receipts
+            tx_hashes = await asyncio.gather(*[
+                asyncio.to_thread(self.w3.eth.send_raw_transaction, signed.rawTransaction)
+                for signed in signed_txns
+            ])
+            receipts = await asyncio.gather(*[
+                asyncio.to_thread(self.w3.eth.wait_for_transaction_receipt, tx_hash)
+                for tx_hash in tx_hashes
+            ])
+
+            results = []
+            for tx_hash, receipt in zip(tx_hashes, receipts):
+                if receipt.status == 1:
+                    results.append(tx_hash.hex())
+                else:
+                    logger.error(f"Transaction failed: {tx_hash.hex()}")
+                    results.append(None)
+            return results
+
+        except Exception as e:
+            logger.error(f"Error anchoring credential batch: {e}")
+            return [None] * len(items)
+
+    async def verify_credential_hash(self, credential_hash: str, credential_id: str) -> Dict[str, Any]:
+        """Verify a credential hash against the blockchain.
+
+        The RPC read runs in a worker thread so the event loop stays free
+        and multiple verifications can be in flight per worker.
+        """
+
         if not self.w3:
             return {
                 "verified": False,
                 "error": "Blockchain not configured"
             }
-        
+
         try:
-            # Contract ABI for reading hashes
-            contract_abi = [
-                {
-                    "inputs": [{"name": "credentialId", "type": "string"}],
-                    "name": "getCredentialHash",
-                    "outputs": [{"name": "", "type": "string"}],
-                    "stateMutability": "view",
-                    "type": "function"
-                }
-            ]
-            
-            if not self.contract_address:
+            if not self._contract:
                 return {
                     "verified": False,
                     "error": "Contract address not configured"
                 }
-            
-            contract = self.w3.eth.contract(
-                address=self.contract_address,
-                abi=contract_abi
+
+            # Get stored hash from blockchain without blocking the event loop
+            stored_hash = await asyncio.to_thread(
+                self._contract.functions.getCredentialHash(credential_id).call
             )
             
-            # Get stored hash from blockchain
-            stored_hash = contract.functions.getCredentialHash(credential_id).call()
-            
             # Compare hashes
             hash_match = stored_hash.lower() == credential_hash.lower()
             
@@ -143,7 +235,14 @@ class BlockchainVerifier:
                 "verified": False,
                 "error": str(e)
             }
-    
+
+    async def verify_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Verify many (credential_hash, credential_id) pairs concurrently."""
+        return list(await asyncio.gather(*[
+            self.verify_credential_hash(credential_hash, credential_id)
+            for credential_hash, credential_id in items
+        ]))
+
     def get_transaction_details(self, tx_hash: str) -> Optional[Dict[str, Any]]:
         """Get details of a blockchain transaction."""
         
@@ -171,9 +270,9 @@ class BlockchainVerifier:
             return None
 
 
-def create_credential_hash(credential_data: Dict[str, Any]) -> str:
-    """Create a deterministic hash of credential data."""
-    
+def _serialize_hash_payload(credential_data: Dict[str, Any]) -> bytes:
+    """Serialize the hashable credential fields to deterministic bytes."""
+
     # Extract key fields for hashing
     hash_data = {
         "credential_id": credential_data.get("credential_id"),
@@ -185,12 +284,34 @@ def create_credential_hash(credential_data: Dict[str, Any]) -> str:
         "issued_at": credential_data.get("issued_at"),
         "expires_at": credential_data.get("expires_at")
     }
-    
-    # Create deterministic JSON string
-    json_string = json.dumps(hash_data, sort_keys=True, separators=(',', ':'))
-    
-    # Calculate SHA256 hash
-    return hashlib.sha256(json_string.encode('utf-8')).hexdigest()
+
+    # orjson emits compact sorted bytes directly, avoiding the str.encode()
+    # copy that json.dumps would require. For pure-ASCII payloads the output
+    # is byte-identical to the historical json.dumps(sort_keys=True,
+    # separators=(',', ':')) form; non-ASCII payloads fall back to it, since
+    # orjson emits raw UTF-8 where json escapes to \uXXXX and the resulting
+    # digests would no longer match hashes already anchored on-chain.
+    serialized = orjson.dumps(hash_data, option=orjson.OPT_SORT_KEYS)
+    if serialized.isascii():
+        return serialized
+    return json.dumps(hash_data, sort_keys=True, separators=(',', ':')).encode()
+
+
+def create_credential_hash(credential_data: Dict[str, Any]) -> str:
+    """Create a deterministic hash of credential data."""
+    return _sha256(_serialize_hash_payload(credential_data)).hexdigest()
+
+
+def create_credential_hashes_batch(credential_items: List[Dict[str, Any]]) -> List[str]:
+    """Hash many credential payloads in parallel for bulk issuance.
+
+    hashlib releases the GIL inside OpenSSL, so a thread pool scales the
+    SHA256 work across cores instead of hashing 10k credentials serially.
+    """
+    payloads = [_serialize_hash_payload(item) for item in credential_items]
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(lambda data: _sha256(data).hexdigest(), payloads))
 
 
 def verify_json_ld_signature(json_ld_data: Dict[str, Any]) -> Dict[str, Any]:
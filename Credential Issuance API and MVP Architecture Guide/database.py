@@ -1,13 +1,33 @@
+import orjson
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from .config import settings
 
-# Create database engine
+
+def _json_serializer(obj) -> str:
+    """Render JSON column values (credential_data, json_ld, ...) with orjson.
+
+    Runs in Rust, stringifies once per write, and handles datetime/UUID
+    values natively so callers don't need isoformat() conversions.
+    """
+    return orjson.dumps(obj).decode()
+
+# Create database engine. The default QueuePool (5 + 10 overflow) is far too
+# small for an auth-hot service, and a larger compiled-query cache keeps hot
+# statements from being re-rendered under load.
 engine = create_engine(
     settings.database_url,
+    pool_size=20,
+    max_overflow=40,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_reset_on_return='rollback',
+    query_cache_size=1200,
+    future=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args={"application_name": "dcp"},
     echo=False  # Set to True for SQL debugging
 )
 
@@ -37,6 +57,12 @@ def create_tables():
     """Create all tables in the database."""
     Base.metadata.create_all(bind=engine)
 
+    # The partitioned parents (analytics_events, audit_logs) reject inserts
+    # until a partition covers the current month, so make sure one exists.
+    # Imported here to avoid a circular import at module load.
+    from .migrations import create_monthly_partitions
+    create_monthly_partitions()
+
 
 def drop_tables():
     """Drop all tables in the database."""
@@ -10,13 +10,15 @@ app = FastAPI()
 
 # Define routes here
 
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
+from fastapi import FastAPI, Depends, Header, HTTPException, status, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-import json
+import asyncio
+import functools
+import orjson
 import os
 from pathlib import Path
 
@@ -24,9 +26,10 @@ from pathlib import Path
 import sys
 sys.path.append('/home/ubuntu/digital-credentials-platform/backend')
 
-from shared.database import get_db_session, create_tables
+from shared.database import get_db_session, create_tables, SessionLocal
 from shared.models import Credential, CredentialTemplate, User, Organization, CredentialStatus, UserRole
 from shared.auth import get_current_user, require_roles, PermissionChecker
+from shared.analytics_buffer import analytics_buffer
 from shared.exceptions import ValidationError, NotFoundError, AuthorizationError, CredentialError
 from shared.utils import (
     generate_credential_id, generate_qr_code, generate_verification_url,
@@ -117,6 +120,9 @@ async def startup_event():
     """Initialize database tables on startup."""
     create_tables()
 
+    # Drain the analytics buffer on a timer so quiet periods still flush
+    asyncio.create_task(analytics_buffer.run())
+
 
 @app.get("/health")
 async def health_check():
@@ -197,7 +203,7 @@ async def create_credential(
     return CredentialResponse.from_orm(credential)
 
 
-@app.post("/credentials/bulk", response_model=List[CredentialResponse])
+@app.post("/credentials/bulk")
 async def create_bulk_credentials(
     request: BulkCredentialCreateRequest,
     background_tasks: BackgroundTasks,
@@ -220,35 +226,47 @@ async def create_bulk_credentials(
     if not permission_checker.can_issue_credentials(str(template.organization_id)):
         raise AuthorizationError("You don't have permission to issue credentials for this organization")
     
+    # Validate rows up-front, then resolve every recipient with one IN query
+    # instead of a SELECT per row
+    valid_rows = [
+        cred_data for cred_data in request.credentials
+        if 'recipient_email' in cred_data and 'recipient_name' in cred_data
+    ]
+
+    recipients_by_email = {}
+    if valid_rows:
+        emails = {cred_data['recipient_email'] for cred_data in valid_rows}
+        recipients_by_email = {
+            user.email: user
+            for user in db.query(User).filter(User.email.in_(emails)).all()
+        }
+
+    # Create missing recipient users in one batched write
+    new_users = []
+    for cred_data in valid_rows:
+        email = cred_data['recipient_email']
+        if email in recipients_by_email:
+            continue
+        name_parts = cred_data['recipient_name'].split()
+        recipient = User(
+            email=email,
+            first_name=name_parts[0] if name_parts else "Unknown",
+            last_name=" ".join(name_parts[1:]) if len(name_parts) > 1 else "",
+            role=UserRole.RECIPIENT,
+            is_active=True
+        )
+        recipients_by_email[email] = recipient
+        new_users.append(recipient)
+
+    if new_users:
+        db.bulk_save_objects(new_users, return_defaults=True)
+
+    # Build all credentials in memory and save them in one batch
     created_credentials = []
-    
-    for cred_data in request.credentials:
-        # Validate required fields
-        if 'recipient_email' not in cred_data or 'recipient_name' not in cred_data:
-            continue  # Skip invalid entries
-        
-        # Check if recipient exists
-        recipient = db.query(User).filter(
-            User.email == cred_data['recipient_email']
-        ).first()
-        
-        if not recipient:
-            # Create recipient user
-            name_parts = cred_data['recipient_name'].split()
-            recipient = User(
-                email=cred_data['recipient_email'],
-                first_name=name_parts[0] if name_parts else "Unknown",
-                last_name=" ".join(name_parts[1:]) if len(name_parts) > 1 else "",
-                role=UserRole.RECIPIENT,
-                is_active=True
-            )
-            db.add(recipient)
-            db.flush()
-        
-        # Generate credential
+    for cred_data in valid_rows:
         credential_id = generate_credential_id()
         verification_url = generate_verification_url(credential_id)
-        
+
         credential = Credential(
             credential_id=credential_id,
             title=cred_data.get('title', template.name),
@@ -256,7 +274,7 @@ async def create_bulk_credentials(
             organization_id=template.organization_id,
             template_id=template.id,
             issuer_id=current_user.id,
-            recipient_id=recipient.id,
+            recipient_id=recipients_by_email[cred_data['recipient_email']].id,
             recipient_email=cred_data['recipient_email'],
             recipient_name=cred_data['recipient_name'],
             credential_data=cred_data.get('credential_data', {}),
@@ -265,21 +283,43 @@ async def create_bulk_credentials(
             verification_url=verification_url,
             is_public=cred_data.get('is_public', request.default_is_public)
         )
-        
-        db.add(credential)
         created_credentials.append(credential)
-    
+
+    if created_credentials:
+        db.bulk_save_objects(created_credentials, return_defaults=True)
+
     db.commit()
-    
-    # Generate files for all credentials in background
-    for credential in created_credentials:
-        background_tasks.add_task(
-            generate_credential_files,
-            credential.id,
-            template.design_data
-        )
-    
-    return [CredentialResponse.from_orm(cred) for cred in created_credentials]
+
+    # bulk_save_objects never attaches the objects to the session and does
+    # not fetch non-PK server defaults, so created_at is still None on the
+    # in-memory rows; re-select the batch in one query before serializing
+    if created_credentials:
+        created_ids = [credential.id for credential in created_credentials]
+        created_credentials = db.query(Credential).filter(
+            Credential.id.in_(created_ids)
+        ).all()
+
+    # Generate files for the whole batch in one background task; file
+    # generation fans out internally with bounded concurrency
+    background_tasks.add_task(
+        generate_bulk_credential_files,
+        [credential.id for credential in created_credentials],
+        template.design_data
+    )
+
+    # Stream the JSON array row by row instead of materializing every
+    # response object plus one giant encode in memory; bytes reach the
+    # client while later rows are still serializing
+    def stream_credentials():
+        yield b'['
+        first = True
+        for cred in created_credentials:
+            prefix = b'' if first else b','
+            first = False
+            yield prefix + orjson.dumps(CredentialResponse.from_orm(cred).dict())
+        yield b']'
+
+    return StreamingResponse(stream_credentials(), media_type="application/json")
 
 
 @app.get("/credentials", response_model=List[CredentialResponse])
@@ -293,8 +333,13 @@ async def list_credentials(
     db: Session = Depends(get_db_session)
 ):
     """List credentials with filtering options."""
-    
-    query = db.query(Credential)
+
+    # Eager-load issuer/recipient with two batched SELECTs; serializing the
+    # page must not lazy-load them row by row (N+1)
+    query = db.query(Credential).options(
+        selectinload(Credential.issuer),
+        selectinload(Credential.recipient)
+    )
     
     # Apply filters based on user role and permissions
     if current_user.role == UserRole.RECIPIENT:
@@ -369,7 +414,7 @@ async def update_credential(
         raise NotFoundError("Credential not found")
     
     # Check permissions
-    from shared.auth import check_credential_access
+    from shared.auth import check_credential_access, invalidate_credential_access_cache
     if not check_credential_access(current_user, str(credential.id), db, "write"):
         raise AuthorizationError("Access denied to modify this credential")
     
@@ -386,9 +431,12 @@ async def update_credential(
         credential.is_public = request.is_public
     
     credential.updated_at = datetime.utcnow()
-    
+
     db.commit()
     db.refresh(credential)
+
+    # The update may have flipped is_public; drop the stale access tuple
+    invalidate_credential_access_cache(str(credential.id))
     
     # Regenerate files if data changed
     if request.credential_data is not None or request.title is not None:
@@ -462,7 +510,7 @@ async def revoke_credential(
         raise NotFoundError("Credential not found")
     
     # Check permissions
-    from shared.auth import check_credential_access
+    from shared.auth import check_credential_access, invalidate_credential_access_cache
     if not check_credential_access(current_user, str(credential.id), db, "write"):
         raise AuthorizationError("Access denied to revoke this credential")
     
@@ -473,16 +521,27 @@ async def revoke_credential(
     credential.status = CredentialStatus.REVOKED
     credential.revoked_at = datetime.utcnow()
     credential.revocation_reason = reason
-    
+
     db.commit()
-    
+
+    # Revocation changes access; drop the stale access tuple
+    invalidate_credential_access_cache(str(credential.id))
+
     return {"message": "Credential revoked successfully", "credential_id": credential_id}
 
 
+@functools.lru_cache(maxsize=4096)
+def _file_etag(file_path: str, mtime_ns: int, size: int) -> str:
+    """Hash a credential file once per (path, mtime, size) for ETag reuse."""
+    with open(file_path, 'rb') as f:
+        return calculate_file_hash(f)
+
+
 @app.get("/credentials/{credential_id}/download/{file_type}")
 async def download_credential_file(
     credential_id: str,
     file_type: str,  # pdf or png
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db_session)
 ):
@@ -511,13 +570,29 @@ async def download_credential_file(
     # Check if file exists
     if not os.path.exists(file_path):
         raise NotFoundError("File not found on server")
-    
-    # Return file
+
+    # Issued artifacts are immutable, so clients can cache aggressively and
+    # revalidate by ETag without re-downloading. Only public credentials may
+    # be stored by shared caches; the rest are access-checked per user, and
+    # "public" would let a proxy/CDN re-serve them to anyone.
+    cache_scope = "public" if credential.is_public else "private"
+    stat_result = os.stat(file_path)
+    etag = _file_etag(file_path, stat_result.st_mtime_ns, stat_result.st_size)
+
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    # Return file (passing stat_result lets Starlette use sendfile)
     filename = f"{credential.title}_{credential.credential_id}.{file_type}"
     return FileResponse(
         file_path,
         media_type=f"application/{file_type}" if file_type == "pdf" else "image/png",
-        filename=sanitize_filename(filename)
+        filename=sanitize_filename(filename),
+        stat_result=stat_result,
+        headers={
+            "ETag": etag,
+            "Cache-Control": f"{cache_scope}, max-age=31536000, immutable"
+        }
     )
 
 
@@ -530,14 +605,10 @@ async def generate_credential_files(credential_id: str, template_design: Dict[st
     # 3. Generate PDF and PNG files
     # 4. Update the credential record with file paths
     
-    # For now, we'll just create placeholder files
-    from sqlalchemy.orm import sessionmaker
-    from shared.database import engine
-    
-    Session = sessionmaker(bind=engine)
-    db = Session()
-    
-    try:
+    # For now, we'll just create placeholder files. Sessions come from the
+    # shared module-level factory rather than a per-task sessionmaker, so
+    # each task just borrows a pooled connection.
+    with SessionLocal() as db:
         credential = db.query(Credential).filter(Credential.id == credential_id).first()
         if credential:
             # Create placeholder file paths
@@ -558,15 +629,30 @@ async def generate_credential_files(credential_id: str, template_design: Dict[st
                 "recipient_email": credential.recipient_email,
                 "title": credential.title,
                 "description": credential.description,
-                "issued_at": credential.issued_at.isoformat() if credential.issued_at else None,
-                "expires_at": credential.expires_at.isoformat() if credential.expires_at else None,
+                # orjson at the engine layer serializes datetimes natively
+                "issued_at": credential.issued_at,
+                "expires_at": credential.expires_at,
                 "credential_data": credential.credential_data
             })
             credential.json_ld = json_ld_data
-            
+
             db.commit()
-    finally:
-        db.close()
+
+
+async def generate_bulk_credential_files(credential_ids: List[str], template_design: Dict[str, Any]):
+    """Background task to generate files for a batch of credentials.
+
+    BackgroundTasks runs queued tasks strictly one after another, so a bulk
+    issuance used to serialize N renders behind a single worker. One task
+    now fans out over the batch with semaphore-bounded concurrency.
+    """
+    semaphore = asyncio.Semaphore(8)
+
+    async def generate_one(credential_id: str):
+        async with semaphore:
+            await generate_credential_files(credential_id, template_design)
+
+    await asyncio.gather(*[generate_one(cid) for cid in credential_ids])
 
 
 async def send_credential_notification(credential_id: str):
@@ -7,8 +7,11 @@ from alembic.config import Config
 from alembic.script import ScriptDirectory
 from alembic.environment import EnvironmentContext
 from sqlalchemy import create_engine, text
+import functools
 import os
+import subprocess
 import logging
+from urllib.parse import urlparse
 
 from .config import settings
 from .database import Base, engine
@@ -52,6 +55,9 @@ def init_database():
         # Create all tables
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created successfully")
+
+        # Partitioned tables need a hot partition before the first insert
+        create_monthly_partitions()
         
         # Create initial data if needed
         create_initial_data()
@@ -112,73 +118,215 @@ def create_initial_data():
         session.close()
 
 
-def backup_database(backup_path: str):
-    """Create a database backup."""
-    import subprocess
-    
+@functools.lru_cache(maxsize=1)
+def _pg_env():
+    """Connection settings for the postgres CLI tools, parsed once.
+
+    Passing PGHOST/PGUSER/... through the environment keeps the password
+    out of the command line (and `ps` output) and skips re-parsing the URL
+    on every backup call.
+    """
+    parsed = urlparse(settings.database_url)
+    env = {}
+    if parsed.hostname:
+        env["PGHOST"] = parsed.hostname
+    if parsed.port:
+        env["PGPORT"] = str(parsed.port)
+    if parsed.username:
+        env["PGUSER"] = parsed.username
+    if parsed.password:
+        env["PGPASSWORD"] = parsed.password
+    if parsed.path and parsed.path != "/":
+        env["PGDATABASE"] = parsed.path.lstrip("/")
+    return env
+
+
+def backup_database(backup_path: str, jobs: int = None):
+    """Create a database backup.
+
+    Dumps in directory format (one pre-compressed file per table) with
+    `jobs` parallel workers, so large databases back up near-linearly with
+    CPU count; backup_path is created as a directory.
+    """
     try:
-        # Extract database connection details
-        db_url = settings.database_url
-        # Parse the URL to extract components
-        # This is a simplified version - you might want to use urllib.parse
-        
-        cmd = [
-            "pg_dump",
-            db_url,
-            "-f", backup_path,
-            "--verbose"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        jobs = jobs or os.cpu_count() or 4
+
+        # pg_dump writes the directory itself; connection details travel
+        # via PG* environment variables, and only stderr is collected —
+        # decoded only when the dump fails.
+        proc = subprocess.Popen(
+            ["pg_dump", "-Fd", "-j", str(jobs), "-Z", "6", "-f", backup_path],
+            env={**os.environ, **_pg_env()},
+            stderr=subprocess.PIPE
+        )
+        _, stderr = proc.communicate()
+
+        if proc.returncode == 0:
             logger.info(f"Database backup created successfully: {backup_path}")
         else:
-            logger.error(f"Database backup failed: {result.stderr}")
-            raise Exception(f"Backup failed: {result.stderr}")
-            
+            message = stderr.decode(errors='replace')
+            logger.error(f"Database backup failed: {message}")
+            raise Exception(f"Backup failed: {message}")
+
     except Exception as e:
         logger.error(f"Error creating database backup: {e}")
         raise
 
 
-def restore_database(backup_path: str):
-    """Restore database from backup."""
-    import subprocess
-    
+def restore_database(backup_path: str, jobs: int = None):
+    """Restore database from a directory-format backup.
+
+    Runs pg_restore with `jobs` parallel workers; tune jobs down on boxes
+    where the restore competes with live traffic.
+    """
     try:
         if not os.path.exists(backup_path):
-            raise FileNotFoundError(f"Backup file not found: {backup_path}")
-        
-        # Extract database connection details
-        db_url = settings.database_url
-        
-        cmd = [
-            "psql",
-            db_url,
-            "-f", backup_path,
-            "--verbose"
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+            raise FileNotFoundError(f"Backup directory not found: {backup_path}")
+
+        jobs = jobs or os.cpu_count() or 4
+
+        # pg_restore reads the dump directory itself; connection details
+        # travel via PG* environment variables, chatter goes to /dev/null
+        # and stderr is read only on failure.
+        proc = subprocess.Popen(
+            ["pg_restore", "-Fd", "-j", str(jobs), "-d", _pg_env().get("PGDATABASE", ""), backup_path],
+            env={**os.environ, **_pg_env()},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        _, stderr = proc.communicate()
+
+        if proc.returncode == 0:
             logger.info(f"Database restored successfully from: {backup_path}")
         else:
-            logger.error(f"Database restore failed: {result.stderr}")
-            raise Exception(f"Restore failed: {result.stderr}")
-            
+            message = stderr.decode(errors='replace')
+            logger.error(f"Database restore failed: {message}")
+            raise Exception(f"Restore failed: {message}")
+
     except Exception as e:
         logger.error(f"Error restoring database: {e}")
         raise
 
 
+def backup_database_to_command(upload_cmd, compress: bool = True):
+    """Stream a custom-format dump straight into an upload command.
+
+    pg_dump -Fc writes to stdout and a kernel pipe carries the data into
+    the uploader (e.g. ["aws", "s3", "cp", "-", "s3://bucket/dump.zst"]),
+    optionally through zstd with all cores, so multi-GB dumps never touch
+    local disk and the copy loop stays in the kernel.
+    """
+    env = {**os.environ, **_pg_env()}
+
+    try:
+        dump = subprocess.Popen(["pg_dump", "-Fc"], env=env, stdout=subprocess.PIPE)
+        stages = [dump]
+        upstream = dump
+
+        if compress:
+            zstd = subprocess.Popen(
+                ["zstd", "-T0", "-q"],
+                stdin=upstream.stdout,
+                stdout=subprocess.PIPE
+            )
+            upstream.stdout.close()
+            stages.append(zstd)
+            upstream = zstd
+
+        upload = subprocess.Popen(
+            list(upload_cmd),
+            stdin=upstream.stdout,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        # Close our copies so each producer sees SIGPIPE if its consumer dies
+        upstream.stdout.close()
+        stages.append(upload)
+
+        _, stderr = upload.communicate()
+        for stage in stages[:-1]:
+            stage.wait()
+
+        if any(stage.returncode != 0 for stage in stages):
+            message = stderr.decode(errors='replace')
+            logger.error(f"Streaming backup upload failed: {message}")
+            raise Exception(f"Streaming backup failed: {message}")
+
+        logger.info("Streaming backup upload completed")
+
+    except Exception as e:
+        logger.error(f"Error streaming database backup: {e}")
+        raise
+
+
+def clone_database(source_db_url: str, target_db_url: str = None):
+    """Stream a dump from one database directly into another.
+
+    Connects pg_dump to psql through a pipe, so cloning never touches disk
+    and skips the dump/compress/copy/restore round trip.
+    """
+    try:
+        target_db_url = target_db_url or settings.database_url
+
+        dump = subprocess.Popen(["pg_dump", source_db_url], stdout=subprocess.PIPE)
+        load = subprocess.Popen(
+            ["psql", target_db_url],
+            stdin=dump.stdout,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        # Let pg_dump receive SIGPIPE if psql exits early
+        dump.stdout.close()
+        _, stderr = load.communicate()
+        dump.wait()
+
+        if dump.returncode == 0 and load.returncode == 0:
+            logger.info("Database cloned successfully")
+        else:
+            message = stderr.decode(errors='replace')
+            logger.error(f"Database clone failed: {message}")
+            raise Exception(f"Clone failed: {message}")
+
+    except Exception as e:
+        logger.error(f"Error cloning database: {e}")
+        raise
+
+
+_PARTITIONED_TABLES = ("analytics_events", "audit_logs")
+
+
+def create_monthly_partitions(months_ahead: int = 1):
+    """Pre-create monthly partitions for the range-partitioned tables.
+
+    Run from a scheduler (cron/celery beat) so the partition for next
+    month exists before rows arrive; creation is idempotent via
+    IF NOT EXISTS.
+    """
+    from datetime import date
+
+    today = date.today()
+    with engine.begin() as connection:
+        for offset in range(months_ahead + 1):
+            month = today.month - 1 + offset
+            start = date(today.year + month // 12, month % 12 + 1, 1)
+            next_month = start.month % 12 + 1
+            end = date(start.year + start.month // 12, next_month, 1)
+            for table in _PARTITIONED_TABLES:
+                connection.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {table}_{start.year}_{start.month:02d} "
+                    f"PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+    logger.info(f"Monthly partitions ensured through {months_ahead} month(s) ahead")
+
+
 def check_database_health():
     """Check database connectivity and health."""
     try:
+        # Probes ride the shared pre-pinged pool; exec_driver_sql skips the
+        # text() compile and scalar() avoids materializing a Row per probe.
         with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1"))
-            if result.fetchone()[0] == 1:
+            if connection.exec_driver_sql("SELECT 1").scalar() == 1:
                 logger.info("Database health check passed")
                 return True
     except Exception as e:
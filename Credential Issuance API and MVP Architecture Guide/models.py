@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, JSON, Enum as SQLEnum, DECIMAL
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, ForeignKey, Index, Enum as SQLEnum, DECIMAL, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -53,7 +53,7 @@ class User(Base):
     website = Column(String(500), nullable=True)
     linkedin_url = Column(String(500), nullable=True)
     twitter_url = Column(String(500), nullable=True)
-    privacy_settings = Column(JSON, nullable=True)  # Store privacy preferences
+    privacy_settings = Column(JSONB, nullable=True)  # Store privacy preferences
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
@@ -93,7 +93,7 @@ class Organization(Base):
     website = Column(String(500), nullable=True)
     contact_email = Column(String(255), nullable=True)
     is_verified = Column(Boolean, default=False)
-    settings = Column(JSON, nullable=True)  # Organization-specific settings
+    settings = Column(JSONB, nullable=True)  # Organization-specific settings
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -110,7 +110,7 @@ class OrganizationMember(Base):
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     role = Column(String(50), nullable=False)  # admin, member, viewer
-    permissions = Column(JSON, nullable=True)  # Specific permissions
+    permissions = Column(JSONB, nullable=True)  # Specific permissions
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -127,12 +127,12 @@ class CredentialTemplate(Base):
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
     creator_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     template_type = Column(String(50), nullable=False)  # certificate, badge, diploma
-    design_data = Column(JSON, nullable=False)  # Template design configuration
-    fields_schema = Column(JSON, nullable=False)  # Dynamic fields schema
+    design_data = Column(JSONB, nullable=False)  # Template design configuration
+    fields_schema = Column(JSONB, nullable=False)  # Dynamic fields schema
     status = Column(SQLEnum(TemplateStatus), default=TemplateStatus.DRAFT)
     is_public = Column(Boolean, default=False)
     version = Column(Integer, default=1)
-    tags = Column(JSON, nullable=True)  # Array of tags for categorization
+    tags = Column(JSONB, nullable=True)  # Array of tags for categorization
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -144,6 +144,29 @@ class CredentialTemplate(Base):
 
 class Credential(Base):
     __tablename__ = "credentials"
+    __table_args__ = (
+        # Covering index lets the verify path answer with an index-only
+        # scan, never touching the heap (or the TOASTed JSON columns)
+        Index(
+            "ix_credentials_credid_covering",
+            "credential_id",
+            postgresql_include=["status", "expires_at", "revoked_at"]
+        ),
+        # Partial index over issued credentials only, for org dashboards
+        Index(
+            "ix_credentials_active",
+            "organization_id",
+            "issued_at",
+            postgresql_where=text("status = 'ISSUED'")
+        ),
+        # GIN index for containment queries over the dynamic fields
+        Index(
+            "ix_credentials_credential_data",
+            "credential_data",
+            postgresql_using="gin",
+            postgresql_ops={"credential_data": "jsonb_path_ops"}
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     credential_id = Column(String(100), unique=True, index=True, nullable=False)  # Public credential ID
@@ -157,8 +180,10 @@ class Credential(Base):
     recipient_name = Column(String(255), nullable=False)
     
     # Credential data
-    credential_data = Column(JSON, nullable=False)  # Dynamic credential fields
-    metadata = Column(JSON, nullable=True)  # Additional metadata
+    credential_data = Column(JSONB, nullable=False)  # Dynamic credential fields
+    # "metadata" is reserved by SQLAlchemy's declarative API; keep the DB
+    # column name but expose it as extra_metadata on the Python side
+    extra_metadata = Column("metadata", JSONB, nullable=True)  # Additional metadata
     
     # Status and dates
     status = Column(SQLEnum(CredentialStatus), default=CredentialStatus.DRAFT)
@@ -170,7 +195,7 @@ class Credential(Base):
     # Files and verification
     pdf_url = Column(String(500), nullable=True)
     png_url = Column(String(500), nullable=True)
-    json_ld = Column(JSON, nullable=True)  # JSON-LD representation
+    json_ld = Column(JSONB, nullable=True)  # JSON-LD representation
     verification_url = Column(String(500), nullable=True)
     qr_code_url = Column(String(500), nullable=True)
     
@@ -180,7 +205,7 @@ class Credential(Base):
     
     # Privacy and sharing
     is_public = Column(Boolean, default=True)
-    sharing_settings = Column(JSON, nullable=True)
+    sharing_settings = Column(JSONB, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -203,7 +228,7 @@ class CredentialVerification(Base):
     verifier_user_agent = Column(Text, nullable=True)
     verification_method = Column(String(50), nullable=False)  # qr_code, url, api
     verification_result = Column(SQLEnum(VerificationStatus), nullable=False)
-    verification_details = Column(JSON, nullable=True)  # Additional verification info
+    verification_details = Column(JSONB, nullable=True)  # Additional verification info
     verified_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
@@ -212,6 +237,10 @@ class CredentialVerification(Base):
 
 class AnalyticsEvent(Base):
     __tablename__ = "analytics_events"
+    # Append-mostly and unbounded: range-partition by month so index
+    # maintenance and VACUUM stay bounded to the hot partition, and old
+    # months drop with DROP PARTITION instead of a bulk DELETE
+    __table_args__ = {'postgresql_partition_by': 'RANGE (created_at)'}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     event_type = Column(String(50), nullable=False)  # view, download, share, verify
@@ -220,7 +249,7 @@ class AnalyticsEvent(Base):
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=True)
     
     # Event data
-    event_data = Column(JSON, nullable=True)  # Additional event-specific data
+    event_data = Column(JSONB, nullable=True)  # Additional event-specific data
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
     referrer = Column(String(500), nullable=True)
@@ -229,8 +258,10 @@ class AnalyticsEvent(Base):
     country = Column(String(2), nullable=True)  # ISO country code
     region = Column(String(100), nullable=True)
     city = Column(String(100), nullable=True)
-    
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Part of the primary key because postgres requires the partition key
+    # in every unique constraint on a partitioned table
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True)
 
     # Relationships
     credential = relationship("Credential", back_populates="analytics_events")
@@ -246,7 +277,7 @@ class APIKey(Base):
     key_hash = Column(String(255), unique=True, index=True, nullable=False)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    permissions = Column(JSON, nullable=False)  # API permissions
+    permissions = Column(JSONB, nullable=False)  # API permissions
     is_active = Column(Boolean, default=True)
     expires_at = Column(DateTime(timezone=True), nullable=True)
     last_used_at = Column(DateTime(timezone=True), nullable=True)
@@ -263,7 +294,7 @@ class WebhookEndpoint(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
     url = Column(String(500), nullable=False)
-    events = Column(JSON, nullable=False)  # Array of event types to listen for
+    events = Column(JSONB, nullable=False)  # Array of event types to listen for
     secret = Column(String(255), nullable=False)  # For webhook signature verification
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -280,7 +311,7 @@ class WebhookDelivery(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     endpoint_id = Column(UUID(as_uuid=True), ForeignKey("webhook_endpoints.id"), nullable=False)
     event_type = Column(String(50), nullable=False)
-    payload = Column(JSON, nullable=False)
+    payload = Column(JSONB, nullable=False)
     response_status = Column(Integer, nullable=True)
     response_body = Column(Text, nullable=True)
     attempts = Column(Integer, default=1)
@@ -293,6 +324,7 @@ class WebhookDelivery(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = {'postgresql_partition_by': 'RANGE (created_at)'}
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
@@ -300,10 +332,10 @@ class AuditLog(Base):
     action = Column(String(100), nullable=False)
     resource_type = Column(String(50), nullable=False)  # credential, template, user, etc.
     resource_id = Column(String(255), nullable=True)
-    details = Column(JSON, nullable=True)
+    details = Column(JSONB, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=True)
 
     # Relationships
     user = relationship("User")